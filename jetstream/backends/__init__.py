@@ -1,6 +1,9 @@
+import logging
 import os
 import random
 
+log = logging.getLogger(__name__)
+
 
 class BaseBackend(object):
     """To subclass a backend, just override the "spawn" method with a
@@ -21,6 +24,17 @@ class BaseBackend(object):
         pass
 
 
+def parse_number(name, value, default, cast=int):
+    """Backend parameters are passed straight from the config files, so
+    numbers may arrive as strings. Values that cannot be parsed are logged
+    and replaced with the default."""
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        log.warning(f'Invalid value for {name}: {value!r}, using {default}')
+        return default
+
+
 class PoisonedBackend(BaseBackend):
     async def spawn(self, something):
         if random.random() > 0.95:
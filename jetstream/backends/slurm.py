@@ -1,8 +1,8 @@
 import asyncio
+import functools
 import itertools
 import json
 import logging
-import os
 import sys
 import re
 import shlex
@@ -13,16 +13,34 @@ import time
 from asyncio import Lock
 from asyncio.subprocess import PIPE
 from datetime import datetime, timedelta
-from jetstream.backends import BaseBackend
+from jetstream.backends import BaseBackend, parse_number
 from jetstream.tasks import get_fd_paths
 from jetstream import settings
 
 log = logging.getLogger('jetstream.slurm')
 SLURM_SACCT_DELIMITER = '\037'
 SLURM_JOB_ID_PATTERN = re.compile(r"^(?P<jobid>\d+)(_(?P<arraystepid>\d+))?(\.(?P<stepid>(\d+|batch|extern)))?$")
-SLURM_ACTIVE_STATES = settings['slurm_active_states'].get(list)
-SLURM_PASSED_STATES = settings['slurm_passed_states'].get(list)
+SLURM_ACTIVE_STATES = frozenset(settings['slurm_active_states'].get(list))
+SLURM_PASSED_STATES = frozenset(settings['slurm_passed_states'].get(list))
 SLURM_SBATCH_RETRY = settings['slurm_sbatch_retry'].get(int)
+SLURM_SACCT_CACHE_TTL = settings['slurm_sacct_cache_ttl'].as_number()
+SLURM_SACCT_FIELDS = ('JobID', 'State', 'ExitCode')
+
+# Recent sacct records stored as
+# {jid: {sacct_fields: (timestamp, expires, data)}}
+_sacct_cache = dict()
+
+
+@functools.lru_cache(maxsize=None)
+def check_sbatch(sbatch_executable='sbatch'):
+    """Raises an error if sbatch cannot be run. The check only launches
+    sbatch once per executable, later calls return the cached result."""
+    subprocess.run(
+        [sbatch_executable, '--version'],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
 
 
 class SlurmBackend(BaseBackend):
@@ -52,11 +70,14 @@ class SlurmBackend(BaseBackend):
         super(SlurmBackend, self).__init__()
         self.sbatch_args = sbatch_args
         self.sbatch_executable = sbatch_executable
-        self.sacct_frequency = sacct_frequency
+        self.sacct_frequency = parse_number(
+            'sacct_frequency', sacct_frequency, 60, cast=float)
         self.sacct_fields = sacct_fields
-        self.sbatch_delay = sbatch_delay
+        self.sbatch_delay = parse_number(
+            'sbatch_delay', sbatch_delay, 0.1, cast=float)
         self.sbatch_lock = Lock()
-        self.job_monitor_max_fails = job_monitor_max_fails
+        self.job_monitor_max_fails = parse_number(
+            'job_monitor_max_fails', job_monitor_max_fails, 5)
         self.jobs = dict()
 
         self.coroutines = (self.job_monitor,)
@@ -65,13 +86,7 @@ class SlurmBackend(BaseBackend):
         if self.sbatch_executable is None:
             self.sbatch_executable = shutil.which('sbatch') or 'sbatch'
 
-        with open(os.devnull, 'w') as devnull:
-            subprocess.run(
-                [self.sbatch_executable, '--version'],
-                check=True,
-                stdout=devnull,
-                stderr=devnull
-            )
+        check_sbatch(self.sbatch_executable)
 
         log.info('SlurmBackend initialized')
 
@@ -273,19 +288,41 @@ class SlurmBatchJob(object):
         except AttributeError:
             return other.jid == self.jid
 
+    def __hash__(self):
+        return hash(self.jid)
+
     def __repr__(self):
         return '<SlurmBatchJob: {}>'.format(self.jid)
 
     def _update_state(self, job_data):
         self._job_data = job_data
 
-    def update(self):
-        data = launch_sacct(self.jid)
-
-        if not self.jid in data:
+    def update(self, sacct_fields=None):
+        if self.bulk_update([self], sacct_fields=sacct_fields):
             raise ValueError('No job data found for:  {}'.format(self.jid))
-        else:
-            self.job_data = data[self.jid]
+
+    @classmethod
+    def bulk_update(cls, jobs, sacct_fields=None):
+        """Update many jobs with a single sacct query rather than launching
+        sacct once per job. Returns a list of any jobs that had no records."""
+        jobs = list(jobs)
+        if not jobs:
+            return []
+
+        data = sacct(
+            *[j.jid for j in jobs],
+            sacct_fields=sacct_fields,
+            return_data=True
+        )
+
+        missing = []
+        for job in jobs:
+            if job.jid in data:
+                job.job_data = data[job.jid]
+            else:
+                missing.append(job)
+
+        return missing
 
     def wait(self, *args, **kwargs):
         return wait(self.jid, *args, **kwargs)
@@ -306,8 +343,8 @@ class SlurmBatchJob(object):
             raise ValueError('Job not done yet')
 
         try:
-            return int(self.job_data['ExitCode'].partition(':')[0])
-        except (KeyError, IndexError):
+            return int(self.job_data.get('ExitCode', '').partition(':')[0])
+        except ValueError:
             if self.is_ok():
                 return 0
             else:
@@ -319,53 +356,111 @@ class SlurmBatchJob(object):
         return subprocess.call(cmd_args)
 
     def is_done(self):
-        if self._job_data:
-            state = self._job_data.get('State')
-
-            if state not in SLURM_ACTIVE_STATES:
-                return True
+        if not self._job_data:
+            return False
 
-        return False
+        return self._job_data.get('State') not in SLURM_ACTIVE_STATES
 
     def is_ok(self):
         if not self.is_done():
             raise ValueError('Job is not complete yet.')
 
-        if self.job_data['State'] in SLURM_PASSED_STATES:
-            return True
-        else:
-            return False
+        return self._job_data.get('State') in SLURM_PASSED_STATES
+
 
+def wait(*job_ids, sacct_fields=None, update_frequency=10, timeout=None):
+    """Wait for one or more slurm batch jobs to complete. If timeout is given,
+    a TimeoutError is raised when jobs are still active after that many
+    seconds."""
+    active = {SlurmBatchJob(jid) for jid in job_ids}
+
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
+    else:
+        deadline = None
 
-def wait(*job_ids, sacct_fields=None, update_frequency=10):
-    """Wait for one or more slurm batch jobs to complete"""
     while 1:
-        jobs = sacct(*job_ids, sacct_fields=sacct_fields)
+        SlurmBatchJob.bulk_update(active, sacct_fields=sacct_fields)
+        active = {j for j in active if not j.is_done()}
 
-        if all([j.is_done() for j in jobs]):
+        if not active:
             return
-        else:
-            time.sleep(update_frequency)
 
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(f'{len(active)} slurm jobs still active')
 
-def sacct(*job_ids, sacct_fields=None, chunk_size=1000, strict=False, return_data=False):
+        time.sleep(update_frequency)
+
+
+def invalidate(*job_ids):
+    """Drop any cached sacct records for the given job ids. This should be
+    used after submitting a job, since Slurm may reuse old job ids."""
+    for jid in job_ids:
+        _sacct_cache.pop(str(jid), None)
+
+
+def _prune_sacct_cache(now):
+    """Drop cached records that expired before now (a time.monotonic() value)
+    so the cache does not keep every job seen for the life of the process"""
+    for jid in list(_sacct_cache):
+        records = _sacct_cache[jid]
+        for fields in [f for f, (_, exp, _) in records.items() if exp <= now]:
+            del records[fields]
+
+        if not records:
+            del _sacct_cache[jid]
+
+
+def sacct(*job_ids, sacct_fields=None, chunk_size=1000, strict=False,
+          return_data=False, cache_ttl=None):
     """Query sacct for job records.
 
     Jobs are returned for each job id, but steps will be combined under a
     single job id object. This will return a placeholder job for any job
     id given, regardless of whether job data was returned by sacct. The
     strict option can be used to raise an error when job data is missing
-    for any of the job ids."""
+    for any of the job ids.
+
+    Records younger than cache_ttl seconds (slurm_sacct_cache_ttl setting
+    by default) are reused instead of launching sacct again."""
     if not job_ids:
         raise ValueError('Missing required argument: job_ids')
 
+    if cache_ttl is None:
+        cache_ttl = SLURM_SACCT_CACHE_TTL
+
     job_ids = [str(jid) for jid in job_ids]
     jobs = [SlurmBatchJob(jid) for jid in job_ids]
+    fields = tuple(sacct_fields or SLURM_SACCT_FIELDS)
 
     data = {}
-    for i in range(0, len(job_ids), chunk_size):
-        chunk = job_ids[i: i + chunk_size]
-        sacct_output = launch_sacct(*chunk, sacct_fields=sacct_fields)
+    stale = []
+    now = time.monotonic()
+    for jid in job_ids:
+        try:
+            timestamp, expires, record = _sacct_cache[jid][fields]
+        except KeyError:
+            stale.append(jid)
+            continue
+
+        if now - timestamp < cache_ttl:
+            data[jid] = record
+            # Keep the record around for as long as any caller accepts it
+            expires = max(expires, timestamp + cache_ttl)
+            _sacct_cache[jid][fields] = (timestamp, expires, record)
+        else:
+            stale.append(jid)
+
+    _prune_sacct_cache(now)
+
+    for i in range(0, len(stale), chunk_size):
+        chunk = stale[i: i + chunk_size]
+        sacct_output = launch_sacct(*chunk, sacct_fields=fields)
+        if cache_ttl > 0:
+            now = time.monotonic()
+            expires = now + max(cache_ttl, SLURM_SACCT_CACHE_TTL)
+            for jid, record in sacct_output.items():
+                _sacct_cache.setdefault(jid, {})[fields] = (now, expires, record)
         data.update(sacct_output)
 
     log.debug('Status updates for {} jobs'.format(len(data)))
@@ -394,28 +489,47 @@ def launch_sacct(*job_ids, sacct_fields=None, delimiter=SLURM_SACCT_DELIMITER, r
     :param job_ids: Job ids to include in the query
     :param delimiter: Delimiter to separate parsable results data
     :param raw: Return raw stdout instead of parsed
-    :return: Dict or Bytes
+    :return: Dict or str
     """
+    if sacct_fields is None:
+        sacct_fields = SLURM_SACCT_FIELDS
+
     log.debug('Sacct request for {} jobs...'.format(len(job_ids)))
     args = ['sacct', '-P', '--format', '{}'.format(','.join(sacct_fields)), '--delimiter={}'.format(delimiter)]
 
-    for jid in job_ids:
-        args.extend(['-j', str(jid)])
+    # A single comma-separated selector rather than one -j per job keeps the
+    # command line short when querying many jobs
+    if job_ids:
+        args.extend(['-j', ','.join(str(jid) for jid in job_ids)])
 
-    log.debug('Launching: {}'.format(' '.join([shlex.quote(r) for r in args])))
-    p = subprocess.run(args, stdout=PIPE, check=True)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('Launching: {}'.format(' '.join([shlex.quote(r) for r in args])))
 
     if raw:
-        return p.stdout.decode()
+        p = subprocess.run(args, stdout=PIPE, check=True, encoding='utf-8')
+        return p.stdout
+
+    # Records are parsed as sacct writes them rather than buffering the
+    # entire output, which can be large when polling many jobs
+    with subprocess.Popen(args, stdout=PIPE, encoding='utf-8') as p:
+        data = parse_sacct(p.stdout, delimiter=delimiter)
+
+    if p.returncode != 0:
+        raise subprocess.CalledProcessError(p.returncode, args)
 
-    return parse_sacct(p.stdout.decode(), delimiter=delimiter)
+    return data
 
 
 def parse_sacct(data, delimiter=SLURM_SACCT_DELIMITER, id_pattern=SLURM_JOB_ID_PATTERN):
-    """Parse stdout from sacct to a dictionary of job ids and data."""
+    """Parse stdout from sacct to a dictionary of job ids and data. Data can
+    be a string or any iterable of lines, eg. a file object."""
     jobs = dict()
-    lines = iter(data.splitlines())
-    header = next(lines).split(delimiter)
+
+    if isinstance(data, str):
+        data = data.splitlines()
+
+    lines = (line.rstrip('\n') for line in data)
+    header = next(lines, '').split(delimiter)
 
     for line in lines:
         row = dict(zip(header, line.split(delimiter)))
@@ -518,7 +632,9 @@ def sbatch(cmd, name=None, stdin=None, stdout=None, stderr=None, tasks=None,
                 log.exception(f'Error during sbatch, retrying in 60s ...')
                 time.sleep(60)
 
-    jid = p.stdout.decode().strip()
+    # --parsable output is "<jobid>[;<cluster>]"
+    jid = p.stdout.decode().rstrip().partition(';')[0]
+    invalidate(jid)
     job = SlurmBatchJob(jid)
     job.args = args
     job.script = script
@@ -12,17 +12,47 @@ import signal
 import subprocess
 import time
 from asyncio import Lock, BoundedSemaphore, create_subprocess_shell, CancelledError
-from asyncio.subprocess import PIPE
 from datetime import datetime, timedelta
-from jetstream.backends import BaseBackend
+from jetstream.backends import BaseBackend, parse_number
 from jetstream.tasks import get_fd_paths
 from jetstream import settings
 
+# Job tracking and sacct queries are shared with the standard slurm backend,
+# only the job submission differs. Names that are not used here are still
+# re-exported (see __all__) so they remain importable from this module.
+from jetstream.backends.slurm import (
+    SLURM_SACCT_DELIMITER,
+    SLURM_JOB_ID_PATTERN,
+    SLURM_ACTIVE_STATES,
+    SLURM_PASSED_STATES,
+    SlurmBatchJob,
+    invalidate,
+    launch_sacct,
+    parse_sacct,
+    sacct,
+    wait
+)
+
+__all__ = [
+    'SLURM_SACCT_DELIMITER',
+    'SLURM_JOB_ID_PATTERN',
+    'SLURM_ACTIVE_STATES',
+    'SLURM_PASSED_STATES',
+    'SLURM_SBATCH_RETRY',
+    'SLURM_SOLO_OPTIONS',
+    'SLURM_PRESETS',
+    'RUNNER_PRESETS',
+    'SlurmBatchJob',
+    'SlurmSingularityBackend',
+    'invalidate',
+    'launch_sacct',
+    'parse_sacct',
+    'sacct',
+    'sbatch',
+    'wait',
+]
+
 log = logging.getLogger('jetstream.slurm')
-SLURM_SACCT_DELIMITER = '\037'
-SLURM_JOB_ID_PATTERN = re.compile(r"^(?P<jobid>\d+)(_(?P<arraystepid>\d+))?(\.(?P<stepid>(\d+|batch|extern)))?$")
-SLURM_ACTIVE_STATES = settings['slurm_active_states'].get(list)
-SLURM_PASSED_STATES = settings['slurm_passed_states'].get(list)
 SLURM_SBATCH_RETRY = settings['slurm_sbatch_retry'].get(int)
 SLURM_SOLO_OPTIONS = settings['slurm_solo_options'].get(list)
 SLURM_PRESETS = settings['slurm_presets'].get(dict)
@@ -55,14 +85,17 @@ class SlurmSingularityBackend(BaseBackend):
         :param sbatch: path to the sbatch binary if not on PATH
         """
         super(SlurmSingularityBackend, self).__init__()
-        self.sacct_frequency = sacct_frequency
-        self.sbatch_delay = sbatch_delay
+        self.sacct_frequency = parse_number(
+            'sacct_frequency', sacct_frequency, 60, cast=float)
+        self.sbatch_delay = parse_number(
+            'sbatch_delay', sbatch_delay, 0.5, cast=float)
         self.sbatch_executable = sbatch_executable
         self.sbatch_account = sbatch_account
         self.sacct_fields = sacct_fields
         self.sbatch_lock = Lock()
-        self.job_monitor_max_fails = job_monitor_max_fails
-        self.max_jobs = max_jobs
+        self.job_monitor_max_fails = parse_number(
+            'job_monitor_max_fails', job_monitor_max_fails, 5)
+        self.max_jobs = parse_number('max_jobs', max_jobs, 1024)
         self.jobs = dict()
         self.input_file_validation = input_file_validation
 
@@ -326,204 +359,6 @@ class SlurmSingularityBackend(BaseBackend):
         return task
 
 
-class SlurmBatchJob(object):
-    def __init__(self, jid=None, data=None):
-        self.args = None
-        self._job_data = None
-
-        if data:
-            if jid is None:
-                self.jid = str(data['JobID'])
-            self._update_state(data)
-        else:
-            self.jid = str(jid)
-
-    def __eq__(self, other):
-        try:
-            if other == self.jid:
-                return True
-        except AttributeError:
-            return other.jid == self.jid
-
-    def __repr__(self):
-        return '<SlurmBatchJob: {}>'.format(self.jid)
-
-    def _update_state(self, job_data):
-        self._job_data = job_data
-
-    def update(self):
-        data = launch_sacct(self.jid)
-
-        if self.jid not in data:
-            raise ValueError('No job data found for:  {}'.format(self.jid))
-        else:
-            self.job_data = data[self.jid]
-
-    def wait(self, *args, **kwargs):
-        return wait(self.jid, *args, **kwargs)
-
-    @property
-    def job_data(self):
-        return self._job_data
-
-    @job_data.setter
-    def job_data(self, value):
-        self._update_state(value)
-
-    def returncode(self):
-        """Attempts to returns a standard integer exit code based on Slurm
-        "derived" exit code, but falls back to some dumb heuristics if the
-        exit code isn't parsing."""
-        if not self.is_done():
-            raise ValueError('Job not done yet')
-
-        try:
-            return int(self.job_data['ExitCode'].partition(':')[0])
-        except (KeyError, IndexError):
-            if self.is_ok():
-                return 0
-            else:
-                return 1
-
-    def cancel(self):
-        log.info('Launching "scancel {}"'.format(self.jid))
-        cmd_args = ('scancel', self.jid)
-        return subprocess.call(cmd_args)
-
-    def is_done(self):
-        if self._job_data:
-            state = self._job_data.get('State')
-
-            if state not in SLURM_ACTIVE_STATES:
-                return True
-
-        return False
-
-    def is_ok(self):
-        if not self.is_done():
-            raise ValueError('Job is not complete yet.')
-
-        if self.job_data['State'] in SLURM_PASSED_STATES:
-            return True
-        else:
-            return False
-
-
-def wait(*job_ids, sacct_fields=None, update_frequency=10):
-    """Wait for one or more slurm batch jobs to complete"""
-    while 1:
-        jobs = sacct(*job_ids, sacct_fields=sacct_fields)
-
-        if all([j.is_done() for j in jobs]):
-            return
-        else:
-            time.sleep(update_frequency)
-
-
-def sacct(*job_ids, sacct_fields=None, chunk_size=1000, strict=False, return_data=False):
-    """Query sacct for job records.
-
-    Jobs are returned for each job id, but steps will be combined under a
-    single job id object. This will return a placeholder job for any job
-    id given, regardless of whether job data was returned by sacct. The
-    strict option can be used to raise an error when job data is missing
-    for any of the job ids."""
-    if not job_ids:
-        raise ValueError('Missing required argument: job_ids')
-
-    job_ids = [str(jid) for jid in job_ids]
-    jobs = [SlurmBatchJob(jid) for jid in job_ids]
-
-    data = {}
-    for i in range(0, len(job_ids), chunk_size):
-        chunk = job_ids[i: i + chunk_size]
-        sacct_output = launch_sacct(*chunk, sacct_fields=sacct_fields)
-        data.update(sacct_output)
-
-    log.debug('Status updates for {} jobs'.format(len(data)))
-
-    if return_data:
-        return data
-
-    for job in jobs:
-        if job.jid not in data:
-            if strict:
-                raise ValueError('No records returned for {}'.format(job.jid))
-            else:
-                log.debug('No records found for {}'.format(job.jid))
-        else:
-            job.job_data = data[job.jid]
-
-    return jobs
-
-
-def launch_sacct(*job_ids, sacct_fields=None, delimiter=SLURM_SACCT_DELIMITER, raw=False):
-    """Launch sacct command and return stdout data
-
-    This function returns raw query results, sacct() will be more
-    useful in many cases.
-
-    :param job_ids: Job ids to include in the query
-    :param delimiter: Delimiter to separate parsable results data
-    :param raw: Return raw stdout instead of parsed
-    :return: Dict or Bytes
-    """
-    log.debug('Sacct request for {} jobs...'.format(len(job_ids)))
-    args = ['sacct', '-P', '--format', '{}'.format(','.join(sacct_fields)), '--delimiter={}'.format(delimiter)]
-
-    for jid in job_ids:
-        args.extend(['-j', str(jid)])
-
-    log.debug('Launching: {}'.format(' '.join([shlex.quote(r) for r in args])))
-    p = subprocess.run(args, stdout=PIPE, check=True)
-
-    if raw:
-        return p.stdout.decode()
-
-    return parse_sacct(p.stdout.decode(), delimiter=delimiter)
-
-
-def parse_sacct(data, delimiter=SLURM_SACCT_DELIMITER, id_pattern=SLURM_JOB_ID_PATTERN):
-    """Parse stdout from sacct to a dictionary of job ids and data."""
-    jobs = dict()
-    lines = iter(data.splitlines())
-    header = next(lines).split(delimiter)
-
-    for line in lines:
-        row = dict(zip(header, line.split(delimiter)))
-
-        try:
-            match = id_pattern.match(row['JobID'])
-            groups = match.groupdict()
-        except (KeyError, AttributeError):
-            # Job data restrictions are very loose - there is a small chance
-            # that the chosen delimiter was added to some field in the job
-            # data, and that will break this parser. If that happens records
-            # are skipped and a warning is issued, but parsing continues.
-            log.warning('Error parsing sacct line: {}'.format(line))
-            continue
-
-        # Slurm job ids are <jobid>[_<arrayid>][.<taskid>]. The goal here
-        # is to group all job steps (tasks, array steps) under their
-        # corresponding jid. The steps are added to a list under the key
-        # "_steps", all other data updates the dictionary.
-        jid = groups['jobid']
-
-        if groups['stepid'] or groups['arraystepid']:
-            if jid not in jobs:
-                jobs[jid] = {'_steps': list()}
-
-            jobs[jid]['_steps'].append(row)
-        else:
-            if jid not in jobs:
-                jobs[jid] = dict()
-
-            row['_steps'] = list()
-            jobs[jid].update(row)
-
-    return jobs
-
-
 async def sbatch(cmd, identity, singularity_image, singularity_executable="singularity", 
                  singularity_run_sem=None, singularity_hostname=None, singularity_image_digest=None,
                  runner_args=None, runner_preset=None, docker_authentication_token=None, name=None, 
@@ -728,6 +563,7 @@ async def sbatch(cmd, identity, singularity_image, singularity_executable="singu
                 singularity_run_sem.release()
 
     jid = p.stdout.decode().strip().split()[-1]
+    invalidate(jid)
     job = SlurmBatchJob(jid)
     job.args = submit_sbatch_args
     job.script = sbatch_script_filename
@@ -6,7 +6,6 @@ import importlib
 import json
 import logging
 import os
-import pkg_resources
 import sys
 import textwrap
 import traceback
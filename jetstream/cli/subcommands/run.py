@@ -2,6 +2,7 @@
 import argparse
 import logging
 import subprocess
+import sys
 import jetstream
 from jetstream.cli.subcommands import run_common_options
 
@@ -87,9 +88,11 @@ def template(template, args):
     if args.render_only:
         if args.out:
             with open(args.out, 'w') as fp:
-                print(render, file=fp)
+                fp.write(render)
+                fp.write('\n')
         else:
-            print(render)
+            sys.stdout.write(render)
+            sys.stdout.write('\n')
             return
 
     wf = jetstream.templates.load_workflow(render)
@@ -1,5 +1,6 @@
 """Initiate a Jinja2 environment with template loaders that search
 locations set by arguments or environment variables. """
+import functools
 import json
 import hashlib
 import logging
@@ -152,21 +153,29 @@ def setenv(key, value):
 
 def environment(*searchpath, strict=True, trim_blocks=True, lstrip_blocks=True):
     """Starts a Jinja2 Environment with a FileSystemLoader on the given search
-    path. This adds several features to the standard template processor."""
+    path. This adds several features to the standard template processor.
+
+    Environments are reused for identical arguments so that compiled
+    templates are cached across calls. Templates are not reloaded if their
+    source files change after the first load."""
+    searchpath = tuple(os.path.abspath(p) for p in searchpath)
+    return _environment(searchpath, strict, trim_blocks, lstrip_blocks)
+
+
+@functools.lru_cache(maxsize=16)
+def _environment(searchpath, strict, trim_blocks, lstrip_blocks):
     if strict:
         undefined_handler = StrictUndefined
     else:
         undefined_handler = Undefined
 
-    if searchpath is None:
-        searchpath = [os.getcwd(),]
-
     env = Environment(
         trim_blocks=trim_blocks,
         lstrip_blocks=lstrip_blocks,
         undefined=undefined_handler,
         loader=FileSystemLoader(searchpath=searchpath),
-        extensions=['jinja2.ext.do']
+        extensions=['jinja2.ext.do'],
+        auto_reload=False
     )
 
     env.globals['raise'] = raise_helper
@@ -221,7 +230,9 @@ def render_template(template, project=None, pipeline=None, command_args=None):
 
 def load_workflow(render):
     """Given a rendered template string, loads the tasks and returns a workflow"""
-    log.debug(f'Parsing tasks from render:\n{render}')
+    # Renders can be very large, so avoid copying them into a log message
+    # unless debug logging is actually enabled
+    log.debug('Parsing tasks from render:\n%s', render)
     tasks = jetstream.utils.parse_yaml(render)
 
     if not tasks:
@@ -443,7 +443,8 @@ def load_csv_nh(path):
 
 def load_json(path):
     """Load a json file from path"""
-    return parse_json(_load(path))
+    with open(path, 'r') as fp:
+        return json.load(fp)
 
 
 def load_txt(path):
@@ -453,7 +454,10 @@ def load_txt(path):
 
 def load_yaml(path):
     """Load a yaml file from `path`"""
-    return parse_yaml(_load(path))
+    # The loader reads from the file object directly, this avoids
+    # building the entire document as a string first
+    with open(path, 'r') as fp:
+        return yaml.load(fp, Loader=SafeLoader)
 
 
 def read_lines_allow_gzip(path):
@@ -0,0 +1,213 @@
+import io
+import subprocess
+import jetstream
+from unittest import TestCase, mock
+from jetstream.backends import slurm, parse_number
+
+jetstream.settings.clear()
+jetstream.settings.read(user=False)
+
+SACCT_OUTPUT = '\n'.join([
+    '\037'.join(['JobID', 'State', 'ExitCode']),
+    '\037'.join(['101', 'COMPLETED', '0:0']),
+    '\037'.join(['101.batch', 'COMPLETED', '0:0']),
+    '\037'.join(['102', 'RUNNING', '0:0']),
+]) + '\n'
+
+
+class SlurmSacctTests(TestCase):
+    def test_parse_sacct_string(self):
+        jobs = slurm.parse_sacct(SACCT_OUTPUT)
+        self.assertEqual(set(jobs), {'101', '102'})
+        self.assertEqual(jobs['101']['State'], 'COMPLETED')
+        self.assertEqual(len(jobs['101']['_steps']), 1)
+        self.assertEqual(jobs['102']['ExitCode'], '0:0')
+
+    def test_parse_sacct_stream(self):
+        fp = io.StringIO(SACCT_OUTPUT)
+        self.assertEqual(slurm.parse_sacct(fp), slurm.parse_sacct(SACCT_OUTPUT))
+
+    def test_parse_sacct_empty(self):
+        self.assertEqual(slurm.parse_sacct(''), {})
+
+    def launch_sacct(self, *job_ids, returncode=0):
+        proc = mock.MagicMock(returncode=returncode)
+        proc.__enter__.return_value = proc
+        proc.stdout = io.StringIO(SACCT_OUTPUT)
+        popen = mock.Mock(return_value=proc)
+        with mock.patch.object(slurm.subprocess, 'Popen', popen):
+            data = slurm.launch_sacct(*job_ids)
+        return data, popen.call_args[0][0]
+
+    def test_launch_sacct(self):
+        data, args = self.launch_sacct('101', '102')
+        self.assertEqual(data, slurm.parse_sacct(SACCT_OUTPUT))
+        self.assertEqual(args[-2:], ['-j', '101,102'])
+
+    def test_launch_sacct_no_job_ids(self):
+        data, args = self.launch_sacct()
+        self.assertNotIn('-j', args)
+
+    def test_launch_sacct_error(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.launch_sacct('101', returncode=1)
+
+
+def fake_launch_sacct(*job_ids, sacct_fields=None):
+    return {k: v for k, v in slurm.parse_sacct(SACCT_OUTPUT).items()
+            if k in job_ids}
+
+
+class SlurmSacctCacheTests(TestCase):
+    def setUp(self):
+        slurm._sacct_cache.clear()
+        patcher = mock.patch.object(
+            slurm, 'launch_sacct', side_effect=fake_launch_sacct)
+        self.launch_sacct = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(slurm._sacct_cache.clear)
+
+    def test_cache_hit(self):
+        first = slurm.sacct('101', cache_ttl=60, return_data=True)
+        second = slurm.sacct('101', cache_ttl=60, return_data=True)
+        self.assertEqual(first, second)
+        self.assertEqual(self.launch_sacct.call_count, 1)
+
+    def test_cache_expired(self):
+        with mock.patch.object(slurm.time, 'monotonic', return_value=1000):
+            slurm.sacct('101', cache_ttl=5, return_data=True)
+
+        with mock.patch.object(slurm.time, 'monotonic', return_value=1010):
+            slurm.sacct('101', cache_ttl=5, return_data=True)
+
+        self.assertEqual(self.launch_sacct.call_count, 2)
+
+    def test_cache_only_queries_missing(self):
+        slurm.sacct('101', cache_ttl=60, return_data=True)
+        data = slurm.sacct('101', '102', cache_ttl=60, return_data=True)
+        self.assertEqual(set(data), {'101', '102'})
+        self.assertEqual(self.launch_sacct.call_args[0], ('102',))
+
+    def test_invalidate(self):
+        slurm.sacct('101', cache_ttl=60, return_data=True)
+        slurm.invalidate(101)
+        slurm.sacct('101', cache_ttl=60, return_data=True)
+        self.assertEqual(self.launch_sacct.call_count, 2)
+
+    def test_cache_per_fields(self):
+        slurm.sacct('101', sacct_fields=('JobID', 'State'), cache_ttl=60)
+        slurm.sacct('101', sacct_fields=('JobID', 'ExitCode'), cache_ttl=60)
+        slurm.sacct('101', sacct_fields=('JobID', 'State'), cache_ttl=60)
+        self.assertEqual(self.launch_sacct.call_count, 2)
+        self.assertEqual(len(slurm._sacct_cache['101']), 2)
+
+    def test_zero_ttl_disables_cache(self):
+        slurm.sacct('101', cache_ttl=0, return_data=True)
+        slurm.sacct('101', cache_ttl=0, return_data=True)
+        self.assertEqual(self.launch_sacct.call_count, 2)
+        self.assertEqual(slurm._sacct_cache, {})
+
+    def test_zero_ttl_keeps_other_entries(self):
+        slurm.sacct('101', cache_ttl=60, return_data=True)
+        slurm.sacct('102', cache_ttl=0, return_data=True)
+        self.assertIn('101', slurm._sacct_cache)
+
+    def test_long_ttl_survives_default_ttl_prune(self):
+        with mock.patch.object(slurm.time, 'monotonic', return_value=0):
+            slurm.sacct('101', cache_ttl=60, return_data=True)
+
+        with mock.patch.object(slurm.time, 'monotonic', return_value=10):
+            slurm.sacct('102', return_data=True)
+
+        with mock.patch.object(slurm.time, 'monotonic', return_value=20):
+            slurm.sacct('101', cache_ttl=60, return_data=True)
+
+        calls = [c[0] for c in self.launch_sacct.call_args_list]
+        self.assertEqual(calls, [('101',), ('102',)])
+
+    def test_expired_entries_pruned(self):
+        with mock.patch.object(slurm.time, 'monotonic', return_value=0):
+            slurm.sacct('101', cache_ttl=60, return_data=True)
+
+        with mock.patch.object(slurm.time, 'monotonic', return_value=61):
+            slurm.sacct('102', return_data=True)
+
+        self.assertNotIn('101', slurm._sacct_cache)
+
+
+class SlurmBackendParamTests(TestCase):
+    def test_parse_number(self):
+        self.assertEqual(parse_number('x', '30', 60), 30)
+        self.assertEqual(parse_number('x', '30', 60, cast=float), 30.0)
+        self.assertEqual(parse_number('x', '2.5', 60, cast=float), 2.5)
+        self.assertEqual(parse_number('x', 2.5, 60, cast=float), 2.5)
+
+    def test_parse_number_invalid(self):
+        self.assertEqual(parse_number('x', 'abc', 60), 60)
+        self.assertEqual(parse_number('x', None, 60), 60)
+
+
+class SlurmWaitTests(TestCase):
+    def setUp(self):
+        self.states = {'101': 'COMPLETED', '102': 'RUNNING'}
+        patcher = mock.patch.object(slurm, 'sacct', side_effect=self.fake_sacct)
+        self.sacct = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(slurm.time, 'sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_sacct(self, *job_ids, sacct_fields=None, return_data=False):
+        return {jid: {'JobID': jid, 'State': self.states[jid], '_steps': []}
+                for jid in job_ids if jid in self.states}
+
+    def test_hash(self):
+        jobs = {slurm.SlurmBatchJob(101), slurm.SlurmBatchJob('101')}
+        self.assertEqual(len(jobs), 1)
+
+    def test_bulk_update_missing(self):
+        jobs = [slurm.SlurmBatchJob(101), slurm.SlurmBatchJob(999)]
+        missing = slurm.SlurmBatchJob.bulk_update(jobs)
+        self.assertEqual(missing, [jobs[1]])
+        self.assertTrue(jobs[0].is_done())
+        self.assertEqual(self.sacct.call_count, 1)
+
+    def test_bulk_update_empty(self):
+        self.assertEqual(slurm.SlurmBatchJob.bulk_update([]), [])
+        self.sacct.assert_not_called()
+
+    def test_update_missing(self):
+        with self.assertRaises(ValueError):
+            slurm.SlurmBatchJob(999).update()
+
+    def test_wait_shrinks_active_set(self):
+        def complete(seconds):
+            self.states['102'] = 'COMPLETED'
+
+        self.sleep.side_effect = complete
+        slurm.wait(101, 102, update_frequency=1)
+        self.assertEqual(self.sacct.call_count, 2)
+        self.assertEqual(set(self.sacct.call_args_list[0][0]), {'101', '102'})
+        self.assertEqual(self.sacct.call_args_list[1][0], ('102',))
+        self.sleep.assert_called_once_with(1)
+
+    def test_wait_timeout(self):
+        with mock.patch.object(slurm.time, 'monotonic', side_effect=[0, 5, 11]):
+            with self.assertRaises(TimeoutError):
+                slurm.wait(102, update_frequency=1, timeout=10)
+
+        self.assertEqual(self.sacct.call_count, 2)
+        self.assertEqual(self.sleep.call_count, 1)
+
+
+class SlurmSbatchTests(TestCase):
+    def sbatch(self, stdout):
+        completed = subprocess.CompletedProcess([], 0, stdout=stdout)
+        with mock.patch.object(slurm.subprocess, 'run', return_value=completed):
+            return slurm.sbatch('echo hello')
+
+    def test_sbatch_jid(self):
+        self.assertEqual(self.sbatch(b'12345\n').jid, '12345')
+
+    def test_sbatch_jid_cluster(self):
+        self.assertEqual(self.sbatch(b'12345;cluster1\n').jid, '12345')